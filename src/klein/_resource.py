@@ -6,7 +6,7 @@ from typing import TYPE_CHECKING, Any, Optional, Sequence, Tuple, Union, cast
 from werkzeug.exceptions import HTTPException
 
 from twisted.internet import defer
-from twisted.internet.defer import Deferred, maybeDeferred, succeed
+from twisted.internet.defer import Deferred, maybeDeferred
 from twisted.python import log
 from twisted.python.failure import Failure
 from twisted.web import server
@@ -38,9 +38,25 @@ def ensure_utf8_bytes(v: Union[str, bytes]) -> bytes:
     Coerces a value which is either a C{str} or C{bytes} to a C{bytes}.
     If ``v`` is a C{str} object it is encoded as utf-8.
     """
-    if isinstance(v, str):
-        v = v.encode("utf-8")
-    return v
+    if isinstance(v, bytes):
+        return v
+    return v.encode("utf-8")
+
+
+def _cancel(failure: Failure, d: Deferred) -> None:
+    """
+    Errback cancelling C{d}, which is passed as an extra argument rather than
+    closed over so that no function is created per request.
+    """
+    d.cancel()
+
+
+def _identity(result: Any) -> Any:
+    """
+    Return C{result}, so that L{maybeDeferred} can wrap a value which has
+    already been computed.
+    """
+    return result
 
 
 class _StandInResource:
@@ -60,24 +76,36 @@ class URLDecodeError(Exception):
     Raised if one or more string parts of the URL could not be decoded.
     """
 
-    __slots__ = ["errors"]
+    __slots__ = ("errors", "_repr")
 
     def __init__(self, errors: Sequence[Tuple[str, Failure]]) -> None:
         """
         @param errors: Sequence of decoding errors, expressed as tuples
             of names and an associated failure.
         """
-        self.errors = errors
+        self.errors: Tuple[Tuple[str, Failure], ...] = tuple(errors)
+        self._repr: Optional[str] = None
 
     def __repr__(self) -> str:
-        return f"<URLDecodeError(errors={self.errors!r})>"
+        # errors cannot change after construction, so format it only once.
+        # It is shown as a list, as it was before being stored as a tuple.
+        if self._repr is None:
+            self._repr = f"<URLDecodeError(errors={list(self.errors)!r})>"
+        return self._repr
+
+
+# The names extractURLparts reports decoding failures under, in the order it
+# decodes the parts.
+_URL_PART_NAMES = ("SERVER_NAME", "PATH_INFO", "SCRIPT_NAME")
 
 
 def extractURLparts(request: IRequest) -> Tuple[str, str, int, str, str]:
     """
     Extracts and decodes URI parts from C{request}.
 
-    All strings must be UTF8-decodable.
+    All strings must be UTF8-decodable.  Percent-escapes are left alone:
+    L{twisted.web.server.Request} has already unquoted each path segment, so
+    the path only needs decoding from UTF-8.
 
     @param request: A Twisted Web request.
 
@@ -115,24 +143,29 @@ def extractURLparts(request: IRequest) -> Tuple[str, str, int, str, str]:
 
     url_scheme = "https" if request.isSecure() else "http"
 
+    decoded = []
     utf8Failures = []
-    try:
-        server_name = server_name.decode("utf-8")
-    except UnicodeDecodeError:
-        utf8Failures.append(("SERVER_NAME", Failure()))
-    try:
-        path_text = path_info.decode("utf-8")
-    except UnicodeDecodeError:
-        utf8Failures.append(("PATH_INFO", Failure()))
-    try:
-        script_text = script_name.decode("utf-8")
-    except UnicodeDecodeError:
-        utf8Failures.append(("SCRIPT_NAME", Failure()))
+    for i, part in enumerate((server_name, path_info, script_name)):
+        if not part:
+            # An empty prepath or postpath leaves nothing to decode.
+            decoded.append("")
+            continue
+        if part.isascii():
+            # ASCII is always valid UTF-8, and decodes without validation.
+            decoded.append(part.decode("ascii"))
+            continue
+        try:
+            decoded.append(part.decode("utf-8"))
+        except UnicodeDecodeError as e:
+            # Wrap the exception we already have rather than having Failure
+            # look it up again from sys.exc_info.
+            utf8Failures.append((_URL_PART_NAMES[i], Failure(e)))
 
     if utf8Failures:
         raise URLDecodeError(utf8Failures)
 
-    return url_scheme, server_name, server_port, path_text, script_text
+    server_text, path_text, script_text = decoded
+    return url_scheme, server_text, server_port, path_text, script_text
 
 
 class KleinResource(Resource):
@@ -191,7 +224,7 @@ class KleinResource(Resource):
         def _finish(result: object) -> None:
             request_finished[0] = True
 
-        def _execute() -> Deferred:
+        def _execute() -> KleinRenderable:
             # Actually doing the match right here. This can cause an exception
             # to percolate up. If that happens it will be handled below in
             # processing_failed, either by a user-registered error handler or
@@ -210,20 +243,15 @@ class KleinResource(Resource):
                 _finish,
             )
 
-            # Standard Twisted Web stuff. Defer the method action, giving us
-            # something renderable or printable. Return NOT_DONE_YET and set up
-            # the incremental renderer.
-            d = maybeDeferred(
-                self._app.execute_endpoint, endpoint, request, **kwargs
-            )
-
-            request.notifyFinish().addErrback(  # type: ignore[attr-defined]
-                lambda _: d.cancel(),
-            )
+            result = self._app.execute_endpoint(endpoint, request, **kwargs)
 
-            return d
+            if isinstance(result, Deferred):
+                request.notifyFinish().addErrback(  # type: ignore[attr-defined]
+                    _cancel,
+                    result,
+                )
 
-        d = maybeDeferred(_execute)
+            return result
 
         # typing note: returns Any because Response._applyToRequest returns Any
         def process(r: object) -> Any:
@@ -247,11 +275,9 @@ class KleinResource(Resource):
 
             return r
 
-        d.addCallback(process)
-
         def processing_failed(
             failure: Failure, error_handlers: ErrorHandlers
-        ) -> Optional[Deferred]:
+        ) -> Union[Deferred, bytes, None]:
             # The failure processor writes to the request.  If the
             # request is already finished we should suppress failure
             # processing.  We don't return failure here because there
@@ -275,8 +301,10 @@ class KleinResource(Resource):
                             ensure_utf8_bytes(header), ensure_utf8_bytes(value)
                         )
 
+                    # Returning the body from this errback is enough to pass
+                    # it on to write_response; it needs no Deferred of its own.
                     encoded = resp.iter_encoded()  # type: ignore[attr-defined]
-                    return succeed(ensure_utf8_bytes(b"".join(encoded)))
+                    return b"".join(encoded)
                 else:
                     request.processingFailed(  # type: ignore[attr-defined]
                         failure,
@@ -301,8 +329,6 @@ class KleinResource(Resource):
 
             return processing_failed(failure, error_handlers[1:])
 
-        d.addErrback(processing_failed, self._app._error_handlers)
-
         def write_response(
             r: Union[_StandInResource, str, bytes, int, None]
         ) -> None:
@@ -318,6 +344,27 @@ class KleinResource(Resource):
             if not request_finished[0]:
                 request.finish()
 
+        try:
+            result = _execute()
+        except BaseException:
+            d = defer.fail(Failure(captureVars=Deferred.debug))
+        else:
+            if isinstance(result, (bytes, str)):
+                # Handlers usually return their response body right away, so
+                # write it now rather than passing it through a Deferred.
+                try:
+                    write_response(result)
+                except BaseException:
+                    log.err(None, "Unhandled Error writing response")
+                return server.NOT_DONE_YET  # type: ignore[return-value]
+
+            # The handler has already run; wrap whatever it returned (a value,
+            # a Deferred, a Failure or a coroutine) in a Deferred. Return
+            # NOT_DONE_YET and set up the incremental renderer.
+            d = maybeDeferred(_identity, result)
+
+        d.addCallback(process)
+        d.addErrback(processing_failed, self._app._error_handlers)
         d.addCallback(write_response)
         d.addErrback(log.err, _why="Unhandled Error writing response")
 
@@ -7,10 +7,25 @@ Hypothesis-like stub, to keep the structure of our tests in a
 Hypothesis-friendly shape, in case we want to put it back.
 """
 
-from functools import wraps
-from itertools import product
+from collections import deque
+from functools import lru_cache, partial
+from itertools import combinations, cycle, islice, product, starmap
+from keyword import iskeyword
+from os import environ
 from string import ascii_uppercase
-from typing import Callable, Iterable, Optional, Tuple, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+from warnings import warn
 
 from hyperlink import DecodedURL
 
@@ -18,79 +33,333 @@ from hyperlink import DecodedURL
 T = TypeVar("T")
 S = TypeVar("S")
 
+_MAX_FULL_COMBINATIONS = int(environ.get("KLEIN_MAX_COMBINATIONS", "10000"))
+
+
+class _Values(Generic[T]):
+    """
+    A factory which generates the same, prebuilt, values every time it is
+    called.
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: Tuple[T, ...]) -> None:
+        self._values = values
+
+    def __call__(self) -> Tuple[T, ...]:
+        return self._values
+
+
+# The values generated by the factories below never change, so they are built
+# once, here, rather than every time a factory is called.
+_BINARY = _Values((b"data", b"data data data", b"\x00" * 50, b""))
+_ASCII_TEXT = _Values(("ascii-text", "some more ascii text"))
+_LATIN1_TEXT = ("latin1-text", "some more latin1 text", "hére is latin1 text")
+_BOOLEANS = _Values((True, False))
+_JSON_OBJECTS: _Values[object] = _Values(
+    (
+        {},
+        {"hello": "world"},
+        {"here is": {"some": "nesting"}},
+        {
+            "and": "multiple",
+            "keys": {
+                "with": "nesting",
+                "and": 1234,
+                "numbers": ["with", "lists", "too"],
+                "also": ("tuples", "can", "serialize"),
+            },
+        },
+    )
+)
+_DECODED_URLS = _Values(
+    tuple(
+        DecodedURL.from_text(url)
+        for url in (
+            "https://example.com/",
+            "https://example.com",
+            "http://example.com/",
+            "https://example.com/é",
+            "https://súbdomain.example.com/ascii/path/",
+        )
+    )
+)
+_TEXT_HEADER_PAIRS: _Values[Tuple[Tuple[str, str], ...]] = _Values(
+    ((), (("text", "header"),))
+)
+_BYTES_HEADER_PAIRS: _Values[Tuple[Tuple[str, bytes], ...]] = _Values(
+    ((), (("bytes", b"header"),))
+)
+
+
+def _materialize(
+    factories: Iterable[Callable[[], Iterable[T]]]
+) -> Tuple[Tuple[T, ...], ...]:
+    """
+    Call each of the given factories, collecting the values they generate.
+    """
+    return tuple(tuple(eachFactory()) for eachFactory in factories)
+
+
+def _eachValue(pools: Sequence[Sequence[T]]) -> Iterator[Tuple[T, ...]]:
+    """
+    Generate just enough combinations of the values in C{pools} for every
+    value to appear in at least one of them.
+    """
+    if not pools or not all(pools):
+        yield from product(*pools)
+        return
+    cycles = [cycle(pool) for pool in pools]
+    for _ in range(max(len(pool) for pool in pools)):
+        yield tuple(map(next, cycles))
+
+
+def _pairwise(pools: Sequence[Sequence[T]]) -> Iterator[Tuple[T, ...]]:
+    """
+    Generate combinations of the values in C{pools} such that every pair of
+    values from two different pools appears together in at least one of them.
+
+    Rows are built greedily: each one starts from a pair which has not been
+    covered yet and fills in every other pool with whichever value covers the
+    most pairs which have not been covered yet.
+    """
+    if len(pools) < 2 or not all(pools):
+        yield from product(*pools)
+        return
+
+    def gain(row: Dict[int, int], k: int, c: int) -> int:
+        """
+        Count the uncovered pairs that choosing value C{c} from pool C{k}
+        would cover, given the values already chosen in C{row}.
+        """
+        return sum(
+            ((m, row[m], k, c) if m < k else (k, c, m, row[m])) in uncovered
+            for m in row
+        )
+
+    uncovered = {
+        (i, a, j, b)
+        for i, j in combinations(range(len(pools)), 2)
+        for a in range(len(pools[i]))
+        for b in range(len(pools[j]))
+    }
+    while uncovered:
+        i, a, j, b = min(uncovered)
+        row = {i: a, j: b}
+        for k, pool in enumerate(pools):
+            if k not in row:
+                row[k] = max(range(len(pool)), key=partial(gain, row, k))
+        chosen = [row[k] for k in range(len(pools))]
+        uncovered.difference_update(
+            (m, chosen[m], n, chosen[n])
+            for m, n in combinations(range(len(pools)), 2)
+        )
+        yield tuple(pool[chosen[k]] for k, pool in enumerate(pools))
+
+
+def _runPositional(
+    self: Any,
+    testMethod: Callable[..., None],
+    combinations: Iterable[Tuple[Any, ...]],
+) -> None:
+    """
+    Call a test method once per combination of positional arguments, letting
+    L{starmap} drive the loop and an empty L{deque} consume it so that no
+    Python-level loop is needed.
+    """
+    deque(starmap(partial(testMethod, self), combinations), maxlen=0)
+
+
+@lru_cache(maxsize=None)
+def _compileRunner(
+    positionalCount: int, keywordNames: Tuple[str, ...]
+) -> Callable[[Any, Callable[..., None], Iterable[Tuple[Any, ...]]], None]:
+    """
+    Compile a function which calls a test method once per combination of
+    arguments, unpacking each combination straight into C{positionalCount}
+    positional arguments followed by the keyword arguments named by
+    C{keywordNames}, rather than slicing it and building a L{dict} of keyword
+    arguments for every call.
+    """
+    variables = [f"a{i}" for i in range(positionalCount)]
+    arguments = ["self"] + variables
+    for i, name in enumerate(keywordNames):
+        variables.append(f"k{i}")
+        if name.isidentifier() and not iskeyword(name):
+            arguments.append(f"{name}=k{i}")
+        else:
+            arguments.append(f"**{{{name!r}: k{i}}}")
+    target = "".join(f"{variable}, " for variable in variables)
+    source = (
+        "def run(self, testMethod, combinations):\n"
+        f"    for ({target}) in combinations:\n"
+        f"        testMethod({', '.join(arguments)})\n"
+    )
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, "<given>", "exec"), namespace)
+    return namespace["run"]  # type: ignore[no-any-return]
+
+
+class _Combinations:
+    """
+    The full cartesian product of some pools of values, in the order in which
+    L{product} generates it, whose length is computed from the lengths of the
+    pools rather than by generating the combinations.
+    """
+
+    def __init__(self, pools: Sequence[Sequence[T]]) -> None:
+        self._pools = pools
+        count = 1
+        for pool in pools:
+            count *= len(pool)
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Tuple[Any, ...]]:
+        return product(*self._pools)
+
+
+def _runnerFor(
+    positionalCount: int, keywordNames: Tuple[str, ...]
+) -> Callable[[Any, Callable[..., None], Iterable[Tuple[Any, ...]]], None]:
+    """
+    Choose how to call a test method with C{positionalCount} positional
+    arguments followed by the keyword arguments named by C{keywordNames}.
+    """
+    if keywordNames:
+        return _compileRunner(positionalCount, keywordNames)
+    return _runPositional
+
+
+_STRATEGIES: Dict[
+    str, Callable[[Sequence[Sequence[Any]]], Iterable[Tuple[Any, ...]]]
+] = {
+    "full": _Combinations,
+    "each-value": _eachValue,
+    "pairwise": _pairwise,
+}
+
 
 def given(
     *args: Callable[[], Iterable[T]],
+    _cache: bool = True,
+    _strategy: str = "full",
+    _maxCombinations: Optional[int] = None,
     **kwargs: Callable[[], Iterable[T]],
 ) -> Callable[[Callable[..., None]], Callable[..., None]]:
+    """
+    Run the decorated test once for every combination of the values generated
+    by C{args} and C{kwargs}.
+
+    @param _cache: If true (the default), each factory is called once, when
+        the test is decorated, and the values it generates are reused every
+        time the test runs.  If false, the factories are called again each
+        time the test runs.
+
+    @param _strategy: How to combine the generated values.  C{"full"} (the
+        default) runs the test with every combination, C{"pairwise"} with
+        enough combinations to cover every pair of values from two different
+        factories, and C{"each-value"} with enough combinations to cover every
+        value at least once.
+
+    @param _maxCombinations: If not L{None}, the test is run with at most this
+        many combinations.
+
+    If the full cartesian product has more combinations than the
+    C{KLEIN_MAX_COMBINATIONS} environment variable allows (10000 by default),
+    a warning is emitted and the values are sampled pairwise instead.
+    """
+    try:
+        combine = _STRATEGIES[_strategy]
+    except KeyError:
+        raise ValueError(f"unknown strategy {_strategy!r}") from None
+    factories = args + tuple(kwargs.values())
+    cachedPools = _materialize(factories) if _cache else None
+    runner = _runnerFor(len(args), tuple(kwargs))
+
     def decorator(testMethod: Callable[..., None]) -> Callable[..., None]:
-        @wraps(testMethod)
         def realTestMethod(self: S) -> None:
-            everyPossibleArgs = product(
-                *[eachFactory() for eachFactory in args]
-            )
-            everyPossibleKwargs = product(
-                *[
-                    [(name, eachValue) for eachValue in eachFactory()]
-                    for (name, eachFactory) in kwargs.items()
-                ]
-            )
-            everyPossibleSignature = product(
-                everyPossibleArgs, everyPossibleKwargs
-            )
+            pools = cachedPools
+            if pools is None:
+                pools = _materialize(factories)
+            if len(pools) == 1:
+                # Every strategy reduces to the values themselves, which we
+                # can pass straight through without packing them in tuples.
+                values = islice(pools[0], _maxCombinations)
+                if args:
+                    deque(map(partial(testMethod, self), values), maxlen=0)
+                else:
+                    [name] = kwargs
+                    for value in values:
+                        testMethod(self, **{name: value})
+                return
             # not quite the _full_ cartesian product but the whole point is
             # that we're making a feeble attempt at this rather than bringing
             # in hypothesis.
-            for computedArgs, computedPairs in everyPossibleSignature:
-                computedKwargs = dict(computedPairs)
-                testMethod(self, *computedArgs, **computedKwargs)
-
+            sample = combine
+            if _strategy == "full":
+                count = len(_Combinations(pools))
+                if _maxCombinations is not None:
+                    count = min(count, _maxCombinations)
+                if count > _MAX_FULL_COMBINATIONS:
+                    warn(
+                        f"{testMethod.__qualname__} has {count} combinations,"
+                        f" more than KLEIN_MAX_COMBINATIONS"
+                        f" ({_MAX_FULL_COMBINATIONS}); sampling them"
+                        f" pairwise instead",
+                        stacklevel=2,
+                    )
+                    sample = _pairwise
+            runner(self, testMethod, islice(sample(pools), _maxCombinations))
+
+        # Only the attributes trial looks at, rather than everything wraps()
+        # copies.  The __dict__ carries attributes like skip and todo.
+        realTestMethod.__module__ = testMethod.__module__
+        realTestMethod.__name__ = testMethod.__name__
+        realTestMethod.__qualname__ = testMethod.__qualname__
+        realTestMethod.__doc__ = testMethod.__doc__
+        realTestMethod.__dict__.update(testMethod.__dict__)
+        realTestMethod.__wrapped__ = testMethod  # type: ignore[attr-defined]
         return realTestMethod
 
     return decorator
 
 
-def binary() -> Callable[[], Iterable[bytes]]:
+@lru_cache(maxsize=None)
+def _textValues(allowEmpty: bool, extra: Tuple[str, ...] = ()) -> _Values[str]:
     """
-    Generate some binary data.
+    Build, once per set of arguments, the factory returned by L{latin1_text}
+    and L{text}: its values are the shared latin1 strings, the empty string if
+    C{allowEmpty} is true, then C{extra}.
     """
+    if allowEmpty:
+        return _Values(_LATIN1_TEXT + ("",) + extra)
+    return _Values(_LATIN1_TEXT + extra)
 
-    def params() -> Iterable[bytes]:
-        return [b"data", b"data data data", b"\x00" * 50, b""]
 
-    return params
+def binary() -> Callable[[], Iterable[bytes]]:
+    """
+    Generate some binary data.
+    """
+    return _BINARY
 
 
 def ascii_text(min_size: int) -> Callable[[], Iterable[str]]:
     """
     Generate some ASCII strs.
     """
-
-    def params() -> Iterable[str]:
-        yield from [
-            "ascii-text",
-            "some more ascii text",
-        ]
-        assert min_size, "nothing needs 0-length strings right now"
-
-    return params
+    assert min_size, "nothing needs 0-length strings right now"
+    return _ASCII_TEXT
 
 
 def latin1_text(min_size: int = 0) -> Callable[[], Iterable[str]]:
     """
     Generate some strings encodable as latin1
     """
-
-    def params() -> Iterable[str]:
-        yield from [
-            "latin1-text",
-            "some more latin1 text",
-            "hére is latin1 text",
-        ]
-        if not min_size:
-            yield ""
-
-    return params
+    return _textValues(not min_size)
 
 
 def text(
@@ -99,63 +368,37 @@ def text(
     """
     Generate some text.
     """
-
-    def params() -> Iterable[str]:
-        if alphabet == ascii_uppercase:
-            yield from ascii_text(min_size)()
-            return
-        yield from latin1_text(min_size)()
-        yield "\N{SNOWMAN}"
-
-    return params
+    if alphabet == ascii_uppercase:
+        return ascii_text(min_size)
+    return _textValues(not min_size, ("\N{SNOWMAN}",))
 
 
 def textHeaderPairs() -> Callable[[], Iterable[Iterable[Tuple[str, str]]]]:
     """
     Generate some pairs of headers with text values.
-    """
 
-    def params() -> Iterable[Iterable[Tuple[str, str]]]:
-        return [[], [("text", "header")]]
-
-    return params
+    Each value is a tuple of pairs, so that it may be iterated any number of
+    times by the test it is passed to.
+    """
+    return _TEXT_HEADER_PAIRS
 
 
 def bytesHeaderPairs() -> Callable[[], Iterable[Iterable[Tuple[str, bytes]]]]:
     """
     Generate some pairs of headers with bytes values.
-    """
-
-    def params() -> Iterable[Iterable[Tuple[str, bytes]]]:
-        return [[], [("bytes", b"header")]]
 
-    return params
+    Each value is a tuple of pairs, so that it may be iterated any number of
+    times by the test it is passed to.
+    """
+    return _BYTES_HEADER_PAIRS
 
 
 def booleans() -> Callable[[], Iterable[bool]]:
-    def parameters() -> Iterable[bool]:
-        yield True
-        yield False
-
-    return parameters
+    return _BOOLEANS
 
 
 def jsonObjects() -> Callable[[], Iterable[object]]:
-    def parameters() -> Iterable[object]:
-        yield {}
-        yield {"hello": "world"}
-        yield {"here is": {"some": "nesting"}}
-        yield {
-            "and": "multiple",
-            "keys": {
-                "with": "nesting",
-                "and": 1234,
-                "numbers": ["with", "lists", "too"],
-                "also": ("tuples", "can", "serialize"),
-            },
-        }
-
-    return parameters
+    return _JSON_OBJECTS
 
 
 def decoded_urls() -> Callable[[], Iterable[DecodedURL]]:
@@ -164,12 +407,4 @@ def decoded_urls() -> Callable[[], Iterable[DecodedURL]]:
     <https://github.com/python-hyper/hyperlink/issues/181>} kind of like
     Hyperlink's own hypothesis strategy.
     """
-
-    def parameters() -> Iterable[DecodedURL]:
-        yield DecodedURL.from_text("https://example.com/")
-        yield DecodedURL.from_text("https://example.com")
-        yield DecodedURL.from_text("http://example.com/")
-        yield DecodedURL.from_text("https://example.com/é")
-        yield DecodedURL.from_text("https://súbdomain.example.com/ascii/path/")
-
-    return parameters
+    return _DECODED_URLS
@@ -0,0 +1,198 @@
+# Copyright (c) 2011-2021. See LICENSE for details.
+
+"""
+Tests for L{klein.test.not_hypothesis}.
+"""
+
+from itertools import combinations, product
+from typing import Any, Dict, List, Tuple
+
+from twisted.trial.unittest import SynchronousTestCase
+
+from . import not_hypothesis
+from .not_hypothesis import _Combinations, given
+
+
+__all__ = ()
+
+
+def letters() -> Tuple[str, ...]:
+    return ("a", "b", "c")
+
+
+def digits() -> Tuple[int, ...]:
+    return (1, 2)
+
+
+def flags() -> Tuple[bool, ...]:
+    return (True, False)
+
+
+class GivenTests(SynchronousTestCase):
+    """
+    Tests for L{given}.
+    """
+
+    def runGiven(self, **options: Any) -> List[Tuple[object, ...]]:
+        """
+        Decorate a test with L{given} using the given options and the
+        L{letters}, L{digits} and L{flags} factories, run it, and return the
+        arguments it was called with.
+        """
+        calls: List[Tuple[object, ...]] = []
+
+        @given(letters, digits, flag=flags, **options)
+        def test(self: object, letter: str, digit: int, flag: bool) -> None:
+            calls.append((letter, digit, flag))
+
+        test(self)
+        return calls
+
+    def runWithoutFactories(self, strategy: str) -> List[str]:
+        """
+        Decorate a test with L{given} using the given strategy and no
+        factories, run it, and return the strategy once per call.
+        """
+        calls: List[str] = []
+
+        @given(_strategy=strategy)
+        def test(self: object) -> None:
+            calls.append(strategy)
+
+        test(self)
+        return calls
+
+    def test_full(self) -> None:
+        """
+        By default, the test is run with every combination of values.
+        """
+        self.assertEqual(
+            sorted(self.runGiven()),
+            sorted(
+                (letter, digit, flag)
+                for letter in letters()
+                for digit in digits()
+                for flag in flags()
+            ),
+        )
+
+    def test_eachValue(self) -> None:
+        """
+        The C{"each-value"} strategy runs the test with as many combinations as
+        the largest factory has values, covering every value.
+        """
+        calls = self.runGiven(_strategy="each-value")
+        self.assertEqual(len(calls), len(letters()))
+        for position, factory in enumerate((letters, digits, flags)):
+            self.assertEqual({call[position] for call in calls}, set(factory()))
+
+    def test_noFactories(self) -> None:
+        """
+        Without any factories, every strategy runs the test once.
+        """
+        for strategy in ("full", "each-value", "pairwise"):
+            self.assertEqual(self.runWithoutFactories(strategy), [strategy])
+
+    def test_pairwise(self) -> None:
+        """
+        The C{"pairwise"} strategy runs the test with fewer combinations than
+        C{"full"}, covering every pair of values from two different factories.
+        """
+        calls = self.runGiven(_strategy="pairwise")
+        self.assertLess(len(calls), len(self.runGiven()))
+        pools = (letters(), digits(), flags())
+        for i, j in combinations(range(len(pools)), 2):
+            self.assertEqual(
+                {(call[i], call[j]) for call in calls},
+                {(a, b) for a in pools[i] for b in pools[j]},
+            )
+
+    def test_maxCombinations(self) -> None:
+        """
+        C{_maxCombinations} limits how many times the test is run.
+        """
+        self.assertEqual(len(self.runGiven(_maxCombinations=5)), 5)
+
+    def test_unknownStrategy(self) -> None:
+        """
+        An unknown strategy is rejected when the test is decorated.
+        """
+        self.assertRaises(ValueError, given, letters, _strategy="bogus")
+
+    def test_keywordNames(self) -> None:
+        """
+        Keyword arguments are passed by name, even when the name is not a
+        valid Python identifier.
+        """
+        calls: List[Dict[str, object]] = []
+        factories: Dict[str, Any] = {
+            "flag": flags,
+            "class": digits,
+            "not-a-name": letters,
+        }
+
+        @given(**factories)
+        def test(self: object, **kwargs: object) -> None:
+            calls.append(kwargs)
+
+        test(self)
+        self.assertEqual(len(calls), 12)
+        self.assertEqual(
+            calls[0], {"flag": True, "class": 1, "not-a-name": "a"}
+        )
+
+    def test_tooManyCombinations(self) -> None:
+        """
+        If the full product has more combinations than allowed, a warning is
+        emitted and the values are sampled pairwise instead.
+        """
+        self.patch(not_hypothesis, "_MAX_FULL_COMBINATIONS", 5)
+        calls = self.runGiven()
+        [warning] = self.flushWarnings()
+        self.assertIn("12 combinations", warning["message"])
+        self.assertEqual(calls, self.runGiven(_strategy="pairwise"))
+
+    def test_tooManyCombinationsLimited(self) -> None:
+        """
+        No warning is emitted if C{_maxCombinations} keeps the number of runs
+        within the allowed number of combinations.
+        """
+        self.patch(not_hypothesis, "_MAX_FULL_COMBINATIONS", 5)
+        calls = self.runGiven(_maxCombinations=3)
+        self.assertEqual(self.flushWarnings(), [])
+        self.assertEqual(calls, list(product(letters(), digits(), flags()))[:3])
+
+    def test_singleFactory(self) -> None:
+        """
+        A test with a single factory is run once per value, whether the
+        factory is passed positionally or by keyword.
+        """
+        calls: List[object] = []
+
+        @given(letters, _maxCombinations=2)
+        def positional(self: object, letter: str) -> None:
+            calls.append(letter)
+
+        @given(digit=digits)
+        def keyword(self: object, digit: int) -> None:
+            calls.append(digit)
+
+        positional(self)
+        keyword(self)
+        self.assertEqual(calls, ["a", "b", 1, 2])
+
+
+class CombinationsTests(SynchronousTestCase):
+    """
+    Tests for L{_Combinations}.
+    """
+
+    def test_length(self) -> None:
+        """
+        The length is the number of combinations, which iterating generates in
+        the order in which L{product} generates them.
+        """
+        pools = (letters(), digits(), flags())
+        combinations = _Combinations(pools)
+        self.assertEqual(len(combinations), 12)
+        self.assertEqual(list(combinations), list(product(*pools)))
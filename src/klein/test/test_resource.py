@@ -1,7 +1,20 @@
 import os
+from functools import lru_cache
 from io import BytesIO
+from pathlib import Path
 from types import MappingProxyType
-from typing import Any, List, Mapping, Optional, Sequence, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 from unittest.mock import ANY, Mock, call
 from urllib.parse import parse_qs
 
@@ -10,7 +23,6 @@ from werkzeug.exceptions import NotFound
 from twisted.internet.defer import CancelledError, Deferred, fail, succeed
 from twisted.internet.error import ConnectionLost
 from twisted.internet.interfaces import IProducer
-from twisted.internet.unix import Server
 from twisted.python.failure import Failure
 from twisted.trial.unittest import SynchronousTestCase
 from twisted.web.http_headers import Headers
@@ -33,14 +45,81 @@ from .util import EqualityTestsMixin, recover
 
 
 emptyMapping: Mapping[Any, Any] = MappingProxyType({})
+_EMPTY_HEADERS = Headers()
+
+thisDirectory = os.path.dirname(__file__)
+initModuleBytes = Path(thisDirectory, "__init__.py").read_bytes()
+
+
+@lru_cache(maxsize=None)
+def _defaultChannel() -> DummyChannel:
+    """
+    Return the L{DummyChannel} shared by L{MockRequest}s that are not given
+    their own.  L{MockRequest} overrides everything that would write to its
+    channel, so sharing one is safe unless a test inspects channel state.
+    """
+    return DummyChannel()
+
+
+class _Recorder:
+    """
+    Record the calls made to a callable while passing them through to it.
+
+    This supports the subset of the L{Mock} call-assertion API used by these
+    tests, without the cost of L{Mock(wraps=...) <Mock>}.
+    """
+
+    __slots__ = ("calls", "_target")
+
+    def __init__(self, target: Callable[..., Any]) -> None:
+        self.calls: List[Tuple[Tuple[Any, ...], Dict[str, Any]]] = []
+        self._target = target
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.calls.append((args, kwargs))
+        return self._target(*args, **kwargs)
+
+    @property
+    def called(self) -> bool:
+        return bool(self.calls)
+
+    @property
+    def call_count(self) -> int:
+        return len(self.calls)
+
+    @property
+    def call_args(self) -> Any:
+        return self.calls[-1] if self.calls else None
+
+    def assert_called_with(self, *args: Any, **kwargs: Any) -> None:
+        expected = call(*args, **kwargs)
+        if self.call_args != expected:
+            raise AssertionError(
+                f"expected {expected}, last called with {self.call_args}"
+            )
+
+    def assert_called_once_with(self, *args: Any, **kwargs: Any) -> None:
+        if self.call_count != 1:
+            raise AssertionError(
+                f"expected 1 call, called {self.call_count} times"
+            )
+        self.assert_called_with(*args, **kwargs)
+
+    def assert_has_calls(self, calls: Sequence[Any]) -> None:
+        expected = list(calls)
+        for stop in range(len(expected), len(self.calls) + 1):
+            start = stop - len(expected)
+            if self.calls[start:stop] == expected:
+                return
+        raise AssertionError(f"{expected} not found in {self.calls}")
 
 
 class MockRequest(Request):
     finished: bool
     startedWriting: bool
-    processingFailed: Mock
-    setResponseCode: Mock
-    setHeader: Mock
+    processingFailed: Union[_Recorder, Callable[..., Any]]
+    setResponseCode: Union[_Recorder, Callable[..., Any]]
+    setHeader: Union[_Recorder, Callable[..., Any]]
 
     def __init__(
         self,
@@ -51,40 +130,42 @@ class MockRequest(Request):
         isSecure: bool = False,
         body: bytes = b"",
         headers: Mapping[bytes, Sequence[bytes]] = emptyMapping,
+        channel: Optional[DummyChannel] = None,
+        instrument: bool = False,
     ):
-        super().__init__(DummyChannel(), False)
-
-        if not headers:
-            headers = {}
-
-        if not body:
-            body = b""
+        if channel is None:
+            channel = _defaultChannel()
+        super().__init__(channel, False)
 
-        path, qpath = (path.split(b"?", 1) + [b""])[:2]
+        path, _, qpath = path.partition(b"?")
 
-        self.site = Mock(Site)
-        self.gotLength(len(body))
-        self.content = BytesIO()
-        self.content.write(body)
-        self.content.seek(0)
-        self.args = parse_qs(qpath)
-        self.selfHeaders = Headers(headers)
         self.setHost(host, port, isSecure)
-        self.uri = path
-        self.prepath: List[bytes] = []
-        self.postpath = path.split(b"/")[1:]
-        self.method = method
-        self.clientproto = b"HTTP/1.1"
+        vars(self).update(
+            site=Mock(Site),
+            content=BytesIO(body),
+            args=parse_qs(qpath) if qpath else {},
+            uri=path,
+            prepath=[],
+            postpath=(
+                path[1:].split(b"/")
+                if path.startswith(b"/")
+                else path.split(b"/")[1:]
+            ),
+            method=method,
+            clientproto=b"HTTP/1.1",
+        )
 
-        self.setHeader = Mock(wraps=self.setHeader)
-        self.setResponseCode = Mock(wraps=self.setResponseCode)
+        # Only tests which assert on these calls ask for them to be recorded.
+        if instrument:
+            self.setHeader = _Recorder(self.setHeader)
+            self.setResponseCode = _Recorder(self.setResponseCode)
+            self.processingFailed = _Recorder(self.processingFailed)
 
-        self._written = BytesIO()
+        self.selfHeaders = Headers(headers) if headers else _EMPTY_HEADERS
+        self._written: List[bytes] = []
         self.finishCount = 0
         self.writeCount = 0
 
-        self.processingFailed = Mock(wraps=self.processingFailed)
-
     def registerProducer(self, producer: IProducer, streaming: bool) -> None:
         self.producer = producer
         for _ in range(2):
@@ -113,7 +194,7 @@ class MockRequest(Request):
         self.startedWriting = True
 
         if not self.finished:
-            self._written.write(data)
+            self._written.append(data)
         else:
             raise RuntimeError(
                 "Request.write called on a request after "
@@ -121,7 +202,7 @@ class MockRequest(Request):
             )
 
     def getWrittenData(self) -> bytes:
-        return self._written.getvalue()
+        return b"".join(self._written)
 
 
 def _render(
@@ -186,6 +267,15 @@ class ChildResource(Resource):
         return b"I'm a child named " + self._name + b"!"
 
 
+@lru_cache(maxsize=64)
+def _childResource(name: bytes) -> ChildResource:
+    """
+    Return a L{ChildResource} for C{name}, shared between requests for the
+    same child since it holds no per-request state.
+    """
+    return ChildResource(name)
+
+
 class ChildrenResource(Resource):
     def render(self, request: IRequest) -> bytes:
         return b"I have children!"
@@ -194,7 +284,13 @@ class ChildrenResource(Resource):
         if path == b"":
             return self
 
-        return ChildResource(path)
+        return _childResource(path)
+
+
+# Neither resource holds any per-request state, so routes can return these
+# instead of building a new one each time.
+_LEAF_RESOURCE = LeafResource()
+_CHILDREN_RESOURCE = ChildrenResource()
 
 
 class ProducingResource(Resource):
@@ -266,7 +362,17 @@ class KleinResourceTests(SynchronousTestCase):
         """
         Assert that the given deferred has fired with the given result.
         """
-        self.assertEqual(self.successResultOf(deferred), result)
+        # Everything here runs synchronously, so read the result off the
+        # Deferred rather than adding a callback to capture it.
+        if not deferred.called or deferred.paused:
+            self.fail(f"Expected deferred to have fired: {deferred!r}")
+        if isinstance(deferred.result, Failure):
+            failure = deferred.result
+            # Handle the failure so that it is reported once, by this
+            # assertion, and not again when the Deferred is collected.
+            deferred.addErrback(lambda _: None)
+            self.fail(f"Expected deferred to succeed: {failure!r}")
+        self.assertEqual(deferred.result, result)
 
     def assertNotFired(self, deferred: Deferred) -> None:
         """
@@ -412,7 +518,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         @app.route("/resource/leaf")
         async def leaf(request: IRequest) -> LeafResource:
-            return LeafResource()
+            return _LEAF_RESOURCE
 
         self.assertFired(_render(resource, request))
 
@@ -464,7 +570,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         @app.route("/resource/leaf")
         def leaf(request: IRequest) -> KleinRenderable:
-            return LeafResource()
+            return _LEAF_RESOURCE
 
         d = _render(self.kr, request)
 
@@ -477,7 +583,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         @app.route("/resource/children/", branch=True)
         def children(request: IRequest) -> KleinRenderable:
-            return ChildrenResource()
+            return _CHILDREN_RESOURCE
 
         d = _render(self.kr, request)
 
@@ -491,7 +597,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         @app.route("/resource/children/", branch=True)
         def children(request: IRequest) -> KleinRenderable:
-            return ChildrenResource()
+            return _CHILDREN_RESOURCE
 
         d = _render(self.kr, request)
 
@@ -532,12 +638,12 @@ class KleinResourceTests(SynchronousTestCase):
         self.assertEqual(request.producer, None)
 
     def test_notFound(self) -> None:
-        request = MockRequest(b"/fourohofour")
+        request = MockRequest(b"/fourohofour", instrument=True)
 
         d = _render(self.kr, request)
 
         self.assertFired(d)
-        setResponseCode = request.setResponseCode
+        setResponseCode = cast(_Recorder, request.setResponseCode)
         setResponseCode.assert_called_with(404)
         self.assertIn(b"404 Not Found", request.getWrittenData())
 
@@ -575,14 +681,11 @@ class KleinResourceTests(SynchronousTestCase):
         app = self.app
 
         request = MockRequest(b"/__init__.py")
-        with open(
-            os.path.join(os.path.dirname(__file__), "__init__.py"), "rb"
-        ) as f:
-            expected = f.read()
+        expected = initModuleBytes
 
         @app.route("/", branch=True)
         def root(request: IRequest) -> KleinRenderable:
-            return File(os.path.dirname(__file__))
+            return File(thisDirectory)
 
         d = _render(self.kr, request)
 
@@ -594,14 +697,11 @@ class KleinResourceTests(SynchronousTestCase):
         app = self.app
 
         request = MockRequest(b"/static/__init__.py")
-        with open(
-            os.path.join(os.path.dirname(__file__), "__init__.py"), "rb"
-        ) as f:
-            expected = f.read()
+        expected = initModuleBytes
 
         @app.route("/static/", branch=True)
         def root(request: IRequest) -> KleinRenderable:
-            return File(os.path.dirname(__file__))
+            return File(thisDirectory)
 
         d = _render(self.kr, request)
 
@@ -617,7 +717,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         @app.route("/", branch=True)
         def root(request: IRequest) -> KleinRenderable:
-            return File(os.path.dirname(__file__))
+            return File(thisDirectory)
 
         d = _render(self.kr, request)
 
@@ -628,7 +728,7 @@ class KleinResourceTests(SynchronousTestCase):
 
     def test_addSlash(self) -> None:
         app = self.app
-        request = MockRequest(b"/foo")
+        request = MockRequest(b"/foo", instrument=True)
 
         @app.route("/foo/")
         def foo(request: IRequest) -> KleinRenderable:
@@ -637,11 +737,12 @@ class KleinResourceTests(SynchronousTestCase):
         d = _render(self.kr, request)
 
         self.assertFired(d)
+        setHeader = cast(_Recorder, request.setHeader)
         self.assertEqual(
-            request.setHeader.call_count,
+            setHeader.call_count,
             3,
         )
-        request.setHeader.assert_has_calls(
+        setHeader.assert_has_calls(
             [
                 call(b"Content-Type", b"text/html; charset=utf-8"),
                 call(b"Content-Length", ANY),
@@ -775,7 +876,7 @@ class KleinResourceTests(SynchronousTestCase):
 
     def test_handlerRaises(self) -> None:
         app = self.app
-        request = MockRequest(b"/")
+        request = MockRequest(b"/", instrument=True)
 
         failures = []
 
@@ -794,13 +895,13 @@ class KleinResourceTests(SynchronousTestCase):
 
         self.assertFired(d)
         self.assertEqual(request.code, 500)
-        processingFailed = request.processingFailed
+        processingFailed = cast(_Recorder, request.processingFailed)
         processingFailed.assert_called_once_with(failures[0])
         self.flushLoggedErrors(RouteFailureTest)
 
     def test_genericErrorHandler(self) -> None:
         app = self.app
-        request = MockRequest(b"/")
+        request = MockRequest(b"/", instrument=True)
 
         failures = []
 
@@ -823,11 +924,11 @@ class KleinResourceTests(SynchronousTestCase):
 
         self.assertFired(d)
         self.assertEqual(request.code, 501)
-        assert not request.processingFailed.called
+        assert not cast(_Recorder, request.processingFailed).called
 
     def test_typeSpecificErrorHandlers(self) -> None:
         app = self.app
-        request = MockRequest(b"/")
+        request = MockRequest(b"/", instrument=True)
         type_error_handled = [False]
         generic_error_handled = [False]
 
@@ -866,7 +967,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         self.assertFired(d)
         self.assertEqual(
-            request.processingFailed.called,
+            cast(_Recorder, request.processingFailed).called,
             False,
         )
         self.assertEqual(type_error_handled[0], False)
@@ -894,7 +995,7 @@ class KleinResourceTests(SynchronousTestCase):
 
     def test_notFoundException(self) -> None:
         app = self.app
-        request = MockRequest(b"/")
+        request = MockRequest(b"/", instrument=True)
         generic_error_handled = [False]
 
         @app.handle_errors(NotFound)
@@ -915,7 +1016,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         self.assertFired(d)
         self.assertEqual(
-            request.processingFailed.called,
+            cast(_Recorder, request.processingFailed).called,
             False,
         )
         self.assertEqual(generic_error_handled[0], False)
@@ -938,7 +1039,7 @@ class KleinResourceTests(SynchronousTestCase):
         Renderables returned by L{handle_errors} are rendered.
         """
         app = self.app
-        request = MockRequest(b"/")
+        request = MockRequest(b"/", instrument=True)
 
         @app.handle_errors(NotFound)
         def handle_not_found(
@@ -952,7 +1053,7 @@ class KleinResourceTests(SynchronousTestCase):
 
         self.assertFired(d)
         self.assertEqual(
-            request.processingFailed.called,
+            cast(_Recorder, request.processingFailed).called,
             False,
         )
         self.assertEqual(request.getWrittenData(), rendered)
@@ -1043,7 +1144,7 @@ class KleinResourceTests(SynchronousTestCase):
 
     def test_routeHandlesRequestFinished(self) -> None:
         app = self.app
-        request = MockRequest(b"/")
+        request = MockRequest(b"/", instrument=True)
 
         cancelled: List[Failure] = []
 
@@ -1064,8 +1165,9 @@ class KleinResourceTests(SynchronousTestCase):
         cancelled[0].trap(CancelledError)
         self.assertEqual(request.getWrittenData(), b"")
         self.assertEqual(request.writeCount, 1)
+        processingFailed = cast(_Recorder, request.processingFailed)
         self.assertEqual(
-            request.processingFailed.call_count,
+            processingFailed.call_count,
             0,
         )
 
@@ -1124,7 +1226,7 @@ class KleinResourceTests(SynchronousTestCase):
 
     def test_cancelledIsEatenOnConnectionLost(self) -> None:
         app = self.app
-        request = MockRequest(b"/")
+        request = MockRequest(b"/", instrument=True)
 
         @app.route("/")
         def root(request: IRequest) -> KleinRenderable:
@@ -1140,7 +1242,7 @@ class KleinResourceTests(SynchronousTestCase):
         request.connectionLost(ConnectionLost())
 
         def _cb(result: object) -> None:
-            processingFailed = request.processingFailed
+            processingFailed = cast(_Recorder, request.processingFailed)
             self.assertEqual(
                 processingFailed.call_count,
                 0,
@@ -1177,6 +1279,18 @@ class KleinResourceTests(SynchronousTestCase):
         self.assertEqual(ensure_utf8_bytes("\u2202"), b"\xe2\x88\x82")
         self.assertEqual(ensure_utf8_bytes(b"\xe2\x88\x82"), b"\xe2\x88\x82")
 
+    def test_ensure_utf8_bytesPassesBytesThrough(self) -> None:
+        """
+        L{ensure_utf8_bytes} returns C{bytes}, including instances of
+        subclasses, as they are rather than copying them.
+        """
+
+        class Subclass(bytes):
+            pass
+
+        for value in (b"\xe2\x88\x82", Subclass(b"abc")):
+            self.assertIs(ensure_utf8_bytes(value), value)
+
     def test_decodesPath(self) -> None:
         """
         server_name, path_info, and script_name are decoded as UTF-8 before
@@ -1190,6 +1304,49 @@ class KleinResourceTests(SynchronousTestCase):
         self.assertIsInstance(kreq.mapper.path_info, str)
         self.assertIsInstance(kreq.mapper.script_name, str)
 
+    def test_kleinRequestCached(self) -> None:
+        """
+        Adapting a request to L{IKleinRequest} always gives the same object,
+        so handlers see the mapper that rendering stored on it.
+        """
+        request = MockRequest(b"/")
+        adapted = IKleinRequest(request)
+        self.assertIs(IKleinRequest(request), adapted)
+        _render(self.kr, request)
+        self.assertIs(IKleinRequest(request), adapted)
+        self.assertIsNot(IKleinRequest(MockRequest(b"/")), adapted)
+
+    def test_routeAddedAfterRequest(self) -> None:
+        """
+        A route added after a request for its path was handled is matched by
+        later requests for that path.
+        """
+        first = MockRequest(b"/later")
+        _render(self.kr, first)
+        self.assertEqual(first.code, 404)
+
+        @self.app.route("/later")
+        def later(request: IRequest) -> KleinRenderable:
+            return b"later"
+
+        second = MockRequest(b"/later")
+        _render(self.kr, second)
+        self.assertEqual(second.getWrittenData(), b"later")
+
+    def test_mapperBoundToPath(self) -> None:
+        """
+        Requests for different paths on the same host get mappers bound to
+        their own path, since handlers may rely on C{mapper.path_info}.
+        """
+        mappers = []
+        for path in (b"/one", b"/two"):
+            request = MockRequest(path)
+            _render(self.kr, request)
+            mappers.append(IKleinRequest(request).mapper)
+        self.assertEqual(
+            [mapper.path_info for mapper in mappers], ["/one", "/two"]
+        )
+
     def test_failedDecodePathInfo(self) -> None:
         """
         If decoding of one of the URL parts (in this case PATH_INFO) fails, the
@@ -1258,13 +1415,13 @@ class KleinResourceTests(SynchronousTestCase):
         self.assertFired(d)
         self.assertEqual(request.getWrittenData(), b"42")
 
-        request = MockRequest(b"/alias")
+        request = MockRequest(b"/alias", instrument=True)
         d = _render(self.kr, request)
         self.assertFired(d)
         # Werkzeug switched the redirect status code used from 301 to 308.
         # Both are valid here.
         self.assertIn(
-            request.setResponseCode.call_args[0],
+            cast(_Recorder, request.setResponseCode).call_args[0],
             [(301,), (308,)],
         )
 
@@ -1275,6 +1432,18 @@ class KleinResourceTests(SynchronousTestCase):
         self.assertEqual(reported_length, actual_length)
 
 
+class _UnixServerStub:
+    """
+    Stands in for the host address of an AF_UNIX L{Server}, which unlike an
+    INET address has no port.
+    """
+
+    __slots__ = ("getRequestHostname",)
+
+    def __init__(self, name: str) -> None:
+        self.getRequestHostname = name
+
+
 class ExtractURLpartsTests(SynchronousTestCase):
     """
     Tests for L{klein.resource.extractURLparts}.
@@ -1298,6 +1467,24 @@ class ExtractURLpartsTests(SynchronousTestCase):
         self.assertIsInstance(path_info, str)
         self.assertIsInstance(script_name, str)
 
+    def test_followsPathChanges(self) -> None:
+        """
+        The parts reflect the request's current C{prepath} and C{postpath},
+        which change as nested resources consume segments.
+        """
+        request = MockRequest(b"/sub/app")
+        self.assertEqual(extractURLparts(request)[3:], ("/sub/app", ""))
+        request.prepath = [b"sub"]
+        request.postpath = [b"app"]
+        self.assertEqual(extractURLparts(request)[3:], ("/app", "/sub"))
+
+    def test_percentEscapesKept(self) -> None:
+        """
+        Percent-escapes left in the path segments are not decoded again.
+        """
+        request = MockRequest(b"/a%2Fb/%25")
+        self.assertEqual(extractURLparts(request)[3], "/a%2Fb/%25")
+
     def assertDecodingFailure(
         self, exception: URLDecodeError, part: str
     ) -> None:
@@ -1359,9 +1546,7 @@ class ExtractURLpartsTests(SynchronousTestCase):
         Test proper handling of AF_UNIX sockets
         """
         request = MockRequest(b"/f\xc3\xb6\xc3\xb6")
-        server_mock = Mock(Server)
-        server_mock.getRequestHostname = "/var/run/twisted.socket"
-        request.host = server_mock
+        request.host = _UnixServerStub("/var/run/twisted.socket")
         (
             url_scheme,
             server_name,